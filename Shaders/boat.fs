@@ -4,18 +4,18 @@
 #version 400
 
 // Input data from vertex shader
-in vec2 uv_gs;
+in vec3 uv_gs;
 in vec3 normal_gs;
 
 // Ouput data
 out vec4 fragColor;
 
 // Uniform values that stay constant for the  whole mesh
-uniform sampler2D textureImage;
+uniform sampler2DArray textureImage;
 
 void main(){
 
     // Output fragment data
-    fragColor = texture(textureImage, uv_gs);  // Sample color from texture
+    fragColor = texture(textureImage, uv_gs);  // Sample color from the texture array layer
 
 }
\ No newline at end of file
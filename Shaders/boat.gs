@@ -6,19 +6,34 @@ layout (triangles) in;  // Type of input primitive expected
 layout (triangle_strip, max_vertices=3) out;  // Type of output primitive
 
 // Input data, from vertex shader
-in vec2 uv_vs[];
+in vec3 uv_vs[];
 in vec3 normal_vs[];
 
 // Output data per vertex, passed to primitive assembly and rasterization
 out vec3 normal_gs;
-out vec2 uv_gs;
+out vec3 uv_gs;
 
 // Shader variables
 vec4 pos[gl_in.length()];  // Perturbed vertex positions
 
-// Uniforms, stay constant for the whole mesh
-uniform mat4 MVP;
-uniform float time;
+// Uniforms shared by every mesh, updated once per frame
+layout(std140) uniform Frame {
+    mat4 MVP;
+    float time;
+};
+
+// Gerstner wave parameters, shared by every mesh
+struct Wave {
+    vec2 direction;
+    float frequency;
+    float amplitude;
+    float phase;
+    float sharpness;
+};
+
+layout(std140) uniform Waves {
+    Wave waves[NUM_WAVES];
+};
 
 vec3 Gerstner(vec3 worldpos, float w, float A, float phi, float Q, vec2 D, int N) {
     
@@ -26,8 +41,9 @@ vec3 Gerstner(vec3 worldpos, float w, float A, float phi, float Q, vec2 D, int N
     Q = Q / (w * A * N);
     
     // Compute position of Gerstner wave
-    float x = Q * A * D.x * cos(w * dot(D, vec2(worldpos.x, worldpos.z)) + phi * time);
-    float z = Q * A * D.y * cos(w * dot(D, vec2(worldpos.x, worldpos.z)) + phi * time);
+    float horizontal = Q * A * cos(w * dot(D, worldpos.xz) + phi * time);  // Shared by x and z
+    float x = horizontal * D.x;
+    float z = horizontal * D.y;
     float y = A * sin(w * dot(D, vec2(x, z)) + phi * time);
 
     return vec3(x, y, z);
@@ -41,10 +57,9 @@ void main() {
         vec4 position_gs = gl_in[i].gl_Position;
 
         // Simulate boat bobbing up and down on the water
-        position_gs.y += Gerstner(position_gs.xyz, 4, 0.08, 1.1, 0.75, vec2(0.3, 0.6), 4).y;
-        position_gs.y += Gerstner(position_gs.xyz, 2, 0.05, 1.1, 0.75, vec2(0.2, 0.866), 4).y;
-        position_gs.y += Gerstner(position_gs.xyz, 0.6, 0.2, 0.4, 0.1, vec2(0.3, 0.7), 4).y;
-        position_gs.y += Gerstner(position_gs.xyz, 0.9, 0.15, 0.4, 0.1, vec2(0.8, 0.1), 4).y;
+        for(int j = 0; j < NUM_WAVES; ++j) {
+            position_gs.y += Gerstner(position_gs.xyz, waves[j].frequency, waves[j].amplitude, waves[j].phase, waves[j].sharpness, waves[j].direction, NUM_WAVES).y;
+        }
 
         // Output vertex data
         gl_Position = MVP * position_gs;
@@ -4,11 +4,11 @@
 
 // Input vertex data, different for all executions of this shader
 layout(location = 0) in vec3 vertexPosition;
-layout(location = 1) in vec2 textureCoord;
+layout(location = 1) in vec3 textureCoord;  // Third coordinate is the texture array layer
 layout(location = 2) in vec3 vertexNormal;
 
 // Output data, passed to fragment shader to interpolate color
-out vec2 uv_vs;
+out vec3 uv_vs;
 out vec3 normal_vs;
 
 void main(){
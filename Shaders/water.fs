@@ -2,17 +2,16 @@
 
 #version 400
 
-// Interpolated values from geometry shader
-in vec2 uv_gs;
-in vec3 normal_gs;
-in vec3 eye_gs;
-in vec3 light_gs;
+// Interpolated values from tessellation evaluation shader
+in vec2 uv_tes;
+in vec3 normal_tes;
+in vec3 eye_tes;
+in vec3 light_tes;
 
 // Ouput data
 out vec4 color_out;
 
 // Uniform values that stay constant for the whole mesh
-uniform mat4 MVP;
 uniform sampler2D waterTexture;
 
 void phongColor() {
@@ -21,16 +20,16 @@ void phongColor() {
     vec4 LightColor = vec4(1,1,1,1);
 
     // Material properties
-    vec4 MaterialDiffuseColor = texture(waterTexture, uv_gs);  // Color of the water
+    vec4 MaterialDiffuseColor = texture(waterTexture, uv_tes);  // Color of the water
     vec4 MaterialAmbientColor = vec4(0.2,0.2,0.2,1.0) * MaterialDiffuseColor;  // Simulates indirect lighting
     vec4 MaterialSpecularColor = vec4(0.7, 0.7, 0.7,1.0);  // Reflection highlights
 
     // Compute color
-    vec3 n = normalize(normal_gs);
-    vec3 l = normalize(light_gs);
+    vec3 n = normalize(normal_tes);
+    vec3 l = normalize(light_tes);
     float cosTheta = clamp( dot( n,l ), 0,1 );
 
-    vec3 E = normalize(eye_gs);
+    vec3 E = normalize(eye_tes);
     vec3 R = reflect(-l,n);
     float cosAlpha = clamp( dot( E,R ), 0,1 );
 
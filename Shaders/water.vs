@@ -4,38 +4,44 @@
 
 // Input vertex data, different for all executions of this shader
 layout(location = 0) in vec3 vertexPosition;
-layout(location = 1) in vec3 vertexNormal;
 
 // Output data, passed to tesselation control shader and fragment shader
 out vec3 eye_vs;
 out vec3 light_vs;
-out vec3 normal_vs;
 out vec2 uv_vs;
 
+// Uniforms shared by every mesh, updated once per frame
+layout(std140) uniform Frame {
+    mat4 MVP;
+    float time;
+};
+
 // Uniforms, stay constant for the whole mesh
 uniform mat4 V;
 uniform mat4 M;
-uniform float time;
 uniform vec3 light_direction;
+uniform int numTiles;    // Number of tiles along each axis
+uniform float tileSize;  // Width of each tile
 
 void main(){
-    
+
+    // Offset each instance to its tile, with the tiles centered on the mesh
+    vec2 tile = vec2(gl_InstanceID % numTiles, gl_InstanceID / numTiles) - 0.5 * (numTiles - 1);
+    vec3 position = vertexPosition + vec3(tile.x, 0, tile.y) * tileSize;
+
     // Output vertex position, in world coordinates
-    gl_Position = vec4(vertexPosition,1);
+    gl_Position = vec4(position,1);
 
     // Compute and output texture coordinates
-    uv_vs = (vertexPosition.xz + 0.1 * time) / 50;
+    uv_vs = (position.xz + 0.1 * time) / 50;
 
     // Compute and output required vectors for fragment shader
     // Eye direction
-    vec3 vertexPosition_cameraspace = ( V * M * vec4(vertexPosition,1)).xyz;
+    vec3 vertexPosition_cameraspace = ( V * M * vec4(position,1)).xyz;
     eye_vs = vec3(0,0,0) - vertexPosition_cameraspace;
 
     // Light direction
     vec3 light_position = ( V * vec4(light_direction,1)).xyz;
     light_vs = light_position + eye_vs;
 
-    // Normal
-    normal_vs = ( V * M * vec4(vertexNormal,0)).xyz;
-
 }
\ No newline at end of file
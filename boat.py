@@ -7,12 +7,21 @@ import numpy as np
 from helpers import *
 
 
+# Layout of the interleaved vertex attributes of each vertex. The third
+# texture coordinate is the layer of the texture array sampled by the vertex.
+VERTEX_DTYPE = np.dtype([("position", np.float32, 3),
+                         ("texture_coord", np.float32, 3),
+                         ("normal", np.float32, 3)])
+
+
 class TextureMesh():
     """ Class representing a textured triangle mesh. 
 
-    Vertex attributes and mesh faces are loaded from a PLY file. The mesh's
-    texture is loaded from a bitmap image file. This data is contained in a
-    vertex array object and restored to render the mesh. The shader program
+    The mesh is made up of one or more parts. Each part's vertex attributes
+    and faces are loaded from a PLY file, and its texture is loaded from a
+    bitmap image file. The data for all parts is contained in a single vertex
+    array object and texture array, so the whole mesh is rendered with a
+    single draw call. The shader program
     includes a geometry shader which shifts the vertex positions up and down.
     This creates the effect of the boat bobbing up and down in the water.
 
@@ -24,273 +33,201 @@ class TextureMesh():
 	    Integer ID of the vertex array object used to restore state and render
 	    the mesh.
     texture_ID : int
-        Integer ID of generated texture object.
-    MVP_uniform : int
-        Integer handle for model view projection matrix uniform variable in
-        shader program.
+        Integer ID of generated texture array object. Contains one layer for
+        each part of the mesh.
     texture_uniform : int
         Integer handle for the mesh's texture uniform variable in shader program.
-    time_uniform : int
-        Integer handle for time uniform variable in shader program.
-    num_indices : int
-        Number of indices in the mesh.
+    num_parts : int
+        Number of parts in the mesh.
+    index_counts : np.ndarray, dtype=np.int32
+        Number of indices in each part of the mesh.
+    index_offsets : np.ndarray, dtype=np.uintp
+        Byte offset of each part's indices in the element buffer.
+    base_vertices : np.ndarray, dtype=np.int32
+        Offset of each part's vertices in the vertex buffer. Added to each of
+        the part's indices.
 
     Methods
     -------
-    draw(MVP, time):
+    draw():
         Renders the texture mesh object.
 
     """
 
-    def __init__(self, ply_file, bitmap_file):
+    def __init__(self, ply_files, bitmap_files):
         """ Loads the textured triangle mesh and initializes the shader programs
         to render it.
         
-        Vertex attributes and mesh faces are loaded from a PLY file. The mesh's
-        texture is loaded from a bitmap image file. This data is contained in a
-        vertex array object and restored to render the mesh. The shader program
+        Each part's vertex attributes and faces are loaded from a PLY file, and
+        its texture is loaded from a bitmap image file. This data is contained
+        in a single vertex array object and texture array, which are restored
+        to render the whole mesh at once. The shader program
         includes a geometry shader which shifts the vertex positions up and
         down. This creates the effect of the boat bobbing up and down in the
-        water.
+        water. The parsed mesh data and linked shader program are cached to
+        speed up subsequent runs.
 
         Parameters
         ----------
-        ply_file : str
-            Filepath to a PLY file.
-        bitmap_file : str
-            Filepath to a bitmap image file.
+        ply_files : list[str]
+            Filepath to a PLY file for each part of the mesh.
+        bitmap_files : list[str]
+            Filepath to a bitmap image file for each part of the mesh.
 
         """
 
-        # Read mesh data from PLY file
-        positions,normals,_,texture_coordinates,indices = read_ply(ply_file)
-        self.num_indices = len(indices)
+        self.num_parts = len(ply_files)
 
         # Import shader codes from file
         shader_directory = "Shaders/"
-        vertex_shader_code = open(shader_directory+"boat.vs", 
-        "r").read()
-        geometry_shader_code = open(shader_directory+"boat.gs", "r").read()
-        fragment_shader_code = open(shader_directory+"boat.fs", "r").read()
-
-        # Create vertex and fragment shaders
-        vertex_shader_ID = glCreateShader(GL_VERTEX_SHADER)
-        geometry_shader_ID = glCreateShader(GL_GEOMETRY_SHADER)
-        fragment_shader_ID = glCreateShader(GL_FRAGMENT_SHADER)
-
-        # Set shader source code
-        glShaderSource(vertex_shader_ID, vertex_shader_code) 
-        glShaderSource(geometry_shader_ID, geometry_shader_code)
-        glShaderSource(fragment_shader_ID, fragment_shader_code)
-
-        # Compile shaders
-        glCompileShader(vertex_shader_ID)
-        glCompileShader(geometry_shader_ID)
-        glCompileShader(fragment_shader_ID)
-
-        # Check for compilation errors
-        if not(glGetShaderiv(vertex_shader_ID, GL_COMPILE_STATUS)):
-            raise RuntimeError(glGetShaderInfoLog(vertex_shader_ID))
-        if not(glGetShaderiv(geometry_shader_ID, GL_COMPILE_STATUS)):
-            raise RuntimeError(glGetShaderInfoLog(geometry_shader_ID))
-        if not(glGetShaderiv(fragment_shader_ID, GL_COMPILE_STATUS)):
-            raise RuntimeError(glGetShaderInfoLog(fragment_shader_ID))
-
-
-        # Attach shaders and link shader program
-        self.program_ID = glCreateProgram()
-
-        glAttachShader(self.program_ID, vertex_shader_ID)
-        glAttachShader(self.program_ID, geometry_shader_ID)
-        glAttachShader(self.program_ID, fragment_shader_ID)
-        glLinkProgram(self.program_ID)
-
-        # Check for linking error
-        if not(glGetProgramiv(self.program_ID, GL_LINK_STATUS)):
-            raise RuntimeError(glGetProgramInfoLog(self.program_ID))
-
-
-        # Unlink shader program
-        glDetachShader(self.program_ID, vertex_shader_ID)
-        glDetachShader(self.program_ID, geometry_shader_ID)
-        glDetachShader(self.program_ID, fragment_shader_ID)
-
-        glDeleteShader(vertex_shader_ID)
-        glDeleteShader(geometry_shader_ID)
-        glDeleteShader(fragment_shader_ID)
-
-        glUseProgram(0)
-        
+        vertex_shader_code, geometry_shader_code, fragment_shader_code = read_shader_files([shader_directory+"boat.vs",
+                                                                                             shader_directory+"boat.gs",
+                                                                                             shader_directory+"boat.fs"])
 
-        # Get handle for each uniform variable
-        self.MVP_uniform = glGetUniformLocation(self.program_ID, "MVP")
-        self.time_uniform = glGetUniformLocation(self.program_ID, "time")
-        self.texture_uniform = glGetUniformLocation(self.program_ID, "textureImage")
+        # Define number of Gerstner waves. Their parameters are read from the Waves uniform block
+        geometry_shader_code = specialize_shader(geometry_shader_code, {"NUM_WAVES": len(GERSTNER_WAVES)})
+
+        # Start building shader program. The driver may compile the shaders in the background while the mesh is loaded
+        shaders = [(GL_VERTEX_SHADER, vertex_shader_code),
+                   (GL_GEOMETRY_SHADER, geometry_shader_code),
+                   (GL_FRAGMENT_SHADER, fragment_shader_code)]
+        self.program_ID = begin_program("boat", shaders)
+
+
+        # Read mesh data for each part from PLY files
+        meshes = [load_ply(ply_file) for ply_file in ply_files]
 
 
         # Read bitmap images
-        bitmap_image, texture_width, texture_height = read_bitmap(bitmap_file)
+        bitmaps = [read_bitmap(bitmap_file) for bitmap_file in bitmap_files]
 
-        # Generate textures
-        self.texture_ID = glGenTextures(1)
+        # All layers of a texture array have the same size, so use the largest image size
+        texture_width = max(width for _, width, _ in bitmaps)
+        texture_height = max(height for _, _, height in bitmaps)
 
-        # Load texture image
-        glBindTexture(GL_TEXTURE_2D, self.texture_ID)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA32F, texture_width, texture_height, 0, GL_BGRA, GL_UNSIGNED_BYTE, bitmap_image)
-        glGenerateMipmap(GL_TEXTURE_2D)
-        glBindTexture(GL_TEXTURE_2D, 0)
+        # Stack the images for each part, resizing smaller images using nearest neighbour sampling
+        texture_layers = np.empty((self.num_parts, texture_height, texture_width, 4), dtype=np.uint8)
+        for layer, (bitmap_image, width, height) in enumerate(bitmaps):
+            image = bitmap_image[:width*height*4].reshape(height, width, 4)  # 4 channels (B, G, R, A)
+            rows = np.arange(texture_height) * height // texture_height
+            columns = np.arange(texture_width) * width // texture_width
+            texture_layers[layer] = image[rows][:, columns]
+
+        # Generate texture array, with a layer for each part
+        self.texture_ID = create_texture(texture_layers, texture_width, texture_height, GL_BGRA, self.num_parts)
 
 
         # Create and bind VAO
         self.VAO = glGenVertexArrays(1)
         glBindVertexArray(self.VAO)
 
-        # Create and bind VBO for vertex positions
-        vertex_VBO = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, vertex_VBO)
-        glBufferData(GL_ARRAY_BUFFER, np.dtype(np.float32).itemsize*len(positions), positions, GL_STATIC_DRAW)
-
-        # Set vertex attributes for vertex positions
-        glEnableVertexAttribArray(0)
-        glVertexAttribPointer(
-            0,            # Attribute number
-            3,            # Size (Number of components)
-            GL_FLOAT,     # Type
-            GL_FALSE,     # Normalized?
-            0,            # Stride (Byte offset)
-            None          # Offset
-        )
-
-        # Create and bind VBO for texture coordinates
-        texture_VBO = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, texture_VBO)
-        glBufferData(GL_ARRAY_BUFFER, np.dtype(np.float32).itemsize*len(texture_coordinates), texture_coordinates, GL_STATIC_DRAW)
-
-        # Set vertex attributes for texture coordinates
-        glEnableVertexAttribArray(1)
-        glVertexAttribPointer(
-            1,            # Attribute number
-            2,            # Size (Number of components)
-            GL_FLOAT,     # Type
-            GL_FALSE,     # Normalized?
-            0,            # Stride (Byte offset)
-            None          # Offset
-        )
-
-
-        # Create and bind VBO for vertex normals
-        normal_VBO = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, normal_VBO)
-        glBufferData(GL_ARRAY_BUFFER, np.dtype(np.float32).itemsize*len(normals), normals, GL_STATIC_DRAW)
-
-        # Set vertex attributes for vertex normals
-        glEnableVertexAttribArray(0)
-        glVertexAttribPointer(
-            2,            # Attribute number
-            3,            # Size (Number of components)
-            GL_FLOAT,     # Type
-            GL_TRUE,      # Normalized?
-            0,            # Stride (Byte offset)
-            None          # Offset
-        )
+        # Number of vertices and indices in each part
+        vertex_counts = np.array([len(positions)//3 for positions,_,_,_,_ in meshes])
+        self.index_counts = np.array([len(indices) for _,_,_,_,indices in meshes], dtype=np.int32)
+
+        # Offset of each part's vertices and indices, as the parts are stored one after another
+        self.base_vertices = (np.cumsum(vertex_counts) - vertex_counts).astype(np.int32)
+        self.index_offsets = ((np.cumsum(self.index_counts) - self.index_counts) * np.dtype(np.uint32).itemsize).astype(np.uintp)
+
+        # Interleave vertex attributes, so each vertex is stored contiguously
+        vertex_data = np.empty(vertex_counts.sum(), dtype=VERTEX_DTYPE)
+        for layer, (positions,normals,_,texture_coordinates,_) in enumerate(meshes):
+            part_data = vertex_data[self.base_vertices[layer]:self.base_vertices[layer]+vertex_counts[layer]]
+            part_data["position"] = positions.reshape(-1, 3)
+            part_data["texture_coord"][:, :2] = texture_coordinates.reshape(-1, 2)
+            part_data["texture_coord"][:, 2] = layer  # Sample from the part's texture
+            part_data["normal"] = normals.reshape(-1, 3)
+
+        # Concatenate indices of all parts. Indices are relative to the start of each part's vertices
+        indices = np.concatenate([indices for _,_,_,_,indices in meshes])
+
+        # Create VBO for vertex data
+        vertex_VBO = create_buffer(vertex_data)
+
+        # Set vertex position, texture coordinate and normal attributes
+        set_vertex_attributes(vertex_VBO, VERTEX_DTYPE, [(0, "position", GL_FALSE),
+                                                         (1, "texture_coord", GL_FALSE),
+                                                         (2, "normal", GL_TRUE)])
 
 
         # Create and bind EBO for face indices
-        face_EBO = glGenBuffers(1)
+        face_EBO = create_buffer(indices)
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, face_EBO)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, np.dtype(np.uint32).itemsize*self.num_indices,indices, GL_STATIC_DRAW)
 
         glBindVertexArray(0)  # Unbind VAO
 
 
-    def draw(self, MVP, time):
+        # Wait for shader program to finish building
+        finish_program(self.program_ID, "boat", shaders)
+
+        # Use shared model view projection matrix and time elapsed
+        bind_uniform_block(self.program_ID, "Frame", FRAME_BINDING)
+        bind_uniform_block(self.program_ID, "Waves", WAVES_BINDING)
+
+        # Get handle for each uniform variable
+        self.texture_uniform = glGetUniformLocation(self.program_ID, "textureImage")
+
+
+    def draw(self):
         """ Renders the texture mesh object.
 
-        Parameters
-        ----------
-        MVP : glm.mat4
-            Model view projection matrix.
-        time : float
-            Time elapsed. Used to calculate the position of the wave at a given
-            moment in time, to create the effect of the boat bobbing up and down
-            in the water. 
+        The model view projection matrix and time elapsed are read from the
+        Frame uniform block, which must be updated before drawing.
 
         """
 
-        # Enable blending
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-
-        # Bind water texture
+        # Bind texture array
         glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture_ID)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, self.texture_ID)
 
-        # Use program and set uniforms
+        # Use program
         glUseProgram(self.program_ID)
-        glUniformMatrix4fv(self.MVP_uniform, 1, GL_FALSE, matrix_to_array(MVP, 4))
-        glUniform1f(self.time_uniform, time)
 
         # Bind VAO to restore captured state
         glBindVertexArray(self.VAO)
 
-        # Draw triangles
-        glDrawElements(GL_TRIANGLES, self.num_indices, GL_UNSIGNED_INT, None)
-
-        # Unbind VAO and texture, clean up shader program
-        glBindVertexArray(0)
-        glBindTexture(GL_TEXTURE_2D, 0)
-        glUseProgram(0)
-        glDisable(GL_BLEND)
+        # Draw triangles of all parts in a single call
+        glMultiDrawElementsBaseVertex(GL_TRIANGLES, self.index_counts, GL_UNSIGNED_INT, self.index_offsets, self.num_parts, self.base_vertices)
 
 
 class Boat():
-    """ Contains all textured meshes in the boat. 
+    """ Contains the textured mesh of the boat. 
 
-    Additional details on how each textured mesh is loaded, stored, and rendered
-    can be found in the documentation for the TextureMesh class.
+    The boat's components are stored as parts of a single textured mesh, so
+    the whole boat is rendered at once. Additional details on how the textured
+    mesh is loaded, stored, and rendered can be found in the documentation for
+    the TextureMesh class.
     
     Attributes
     ----------
-    body : TextureMesh
-        Textured triangle mesh for the boat's body (hull and mast).
-    head : TextureMesh
-        Textured triangle mesh for the boat's head.
-    eyes : TextureMesh
-        Textured triangle mesh for the eyes of the boat's head.
+    mesh : TextureMesh
+        Textured triangle mesh with a part for the boat's body (hull and mast),
+        the boat's head, and the eyes of the boat's head.
 
     Methods
     -------
-    draw(MVP, time):
-        Renders the boat by rendering the mesh for each individual component of the boat.
+    draw():
+        Renders the boat.
     
     """
 
     def __init__(self):
-        """ Creates the textured mesh for each component of the boat. """
+        """ Creates the textured mesh containing each component of the boat. """
 
         assets = "Assets/"   # Directory containing all assets (PLY files and bitmap images)
 
-        # Create textured triangle mesh for each component of the boat
-        self.body = TextureMesh(assets+"boat.ply", assets+"boat.bmp")
-        self.head = TextureMesh(assets+"head.ply", assets+"head.bmp")
-        self.eyes = TextureMesh(assets+"eyes.ply", assets+"eyes.bmp")
+        # Create textured triangle mesh with a part for each component of the boat
+        components = ["boat", "head", "eyes"]
+        self.mesh = TextureMesh([assets+component+".ply" for component in components],
+                                [assets+component+".bmp" for component in components])
 
 
-    def draw(self, MVP, time):
-        """ Renders the boat by rendering the mesh for each individual component of the boat.
-        
-        Parameters
-        ----------
-        MVP : glm.mat4
-            Model view projection matrix.
-        time : float
-            Time elapsed. Used to calculate the position of the wave at a given
-            moment in time, to create the effect of the boat bobbing up and down
-            in the water. 
-    
-        
+    def draw(self):
+        """ Renders the boat.
+
+        The model view projection matrix and time elapsed are read from the
+        Frame uniform block, which must be updated before drawing.
+
         """
 
-        self.body.draw(MVP, time)
-        self.head.draw(MVP, time)
-        self.eyes.draw(MVP, time)
+        self.mesh.draw()
@@ -2,7 +2,7 @@
 # Author:  Joelene Hales
 
 import glm
-import numpy as np
+import math
 from helpers import *
 
 
@@ -26,6 +26,9 @@ class Camera():
         Azimuthal angle in camera's position in spherical coordinates.
     phi : float
         Polar angle in camera's position in spherical coordinates.
+    center : glm.vec3 or None
+        Camera's position, in Cartesian coordinates. Calculated when it is first
+        requested after the camera moves, and None until then.
 
     Methods
     -------
@@ -68,9 +71,11 @@ class Camera():
         self.up = up
 
         # Calculate radius, theta, and phi values by converting center coordinate from Cartesian spherical coordinates
-        self.radius = np.sqrt(center.x**2 + center.y**2 + center.z**2)
-        self.theta = np.arctan(center.z / center.x)
-        self.phi = np.arccos(center.y / self.radius)
+        self.radius = math.sqrt(center.x**2 + center.y**2 + center.z**2)
+        self.theta = math.atan2(center.z, center.x)
+        self.phi = math.acos(center.y / self.radius)
+
+        self.center = None  # Calculated when requested
 
 
     def rotatePhi(self, increment):
@@ -89,7 +94,9 @@ class Camera():
         
         # Clamp between epsilon and pi - epsilon to prevent vector from flipping and producing unwanted effects
         epsilon = 0.001
-        self.phi = clamp(self.phi, epsilon, np.pi - epsilon)
+        self.phi = clamp(self.phi, epsilon, math.pi - epsilon)
+
+        self.center = None  # Position must be recalculated
 
 
     def rotateTheta(self, increment):
@@ -105,6 +112,8 @@ class Camera():
 
         self.theta += increment
 
+        self.center = None  # Position must be recalculated
+
 
     def zoomRadius(self, increment):
         """ Increments the radius by a given amount. Has the effect of zooming
@@ -124,9 +133,13 @@ class Camera():
         if (self.radius <= 0.0001):
             self.radius = 0.0001
 
+        self.center = None  # Position must be recalculated
+
 
     def getCenter(self):
-        """ Calculates the camera's position in Cartesian coordinates. 
+        """ Calculates the camera's position in Cartesian coordinates. The
+        position is only recalculated if the camera has moved since it was last
+        requested.
         
         Returns
         -------
@@ -135,14 +148,19 @@ class Camera():
 
         """
 
-        # Calculate each coordinate from spherical coordinates
-        x = self.radius * np.cos(self.theta) * np.sin(self.phi)
-        y = self.radius * np.cos(self.phi)
-        z = self.radius * np.sin(self.theta) * np.sin(self.phi)
+        if self.center is None:  # Camera has moved
+
+            # Distance from the y axis, shared by the x and z coordinates
+            radius_xz = self.radius * math.sin(self.phi)
+
+            # Calculate each coordinate from spherical coordinates
+            x = radius_xz * math.cos(self.theta)
+            y = self.radius * math.cos(self.phi)
+            z = radius_xz * math.sin(self.theta)
 
-        center = glm.vec3(x, y, z)  # Camera position, in Cartesian coordinates
+            self.center = glm.vec3(x, y, z)  # Camera position, in Cartesian coordinates
 
-        return center
+        return self.center
 
 
     def getUp(self):
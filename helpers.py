@@ -2,43 +2,76 @@
 # Author:  Joelene Hales
 
 import os
+import re
 import struct
+import hashlib
+import functools
+import ctypes
+import tempfile
+import zipfile
 import numpy as np
-import warnings
+from concurrent.futures import ThreadPoolExecutor
+from OpenGL.GL import *
+from OpenGL.extensions import hasGLExtension
+from OpenGL.error import GLError
 
 
-def matrix_to_array(matrix, dimensions):
-    """ Converts a square matrix to an array. 
-    
-    Parameters
-    ----------
-    matrix : glm.mat4
-        Matrix to convert to an array
-    dimensions : int
-        Number of rows and columns in the square matrix.
+# Directory containing cached mesh data and shader program binaries
+CACHE_DIRECTORY = ".cache/"
+
+# Parameters of each Gerstner wave making up the water's surface, given as
+# (frequency, amplitude, phase, sharpness, direction)
+GERSTNER_WAVES = [(4.0, 0.08, 1.1, 0.75, (0.3, 0.6)),
+                  (2.0, 0.05, 1.1, 0.75, (0.2, 0.866)),
+                  (0.6, 0.2, 0.4, 0.1, (0.3, 0.7)),
+                  (0.9, 0.15, 0.4, 0.1, (0.8, 0.1))]
+
+# Layout of each Gerstner wave in the Waves uniform block (std140)
+WAVE_DTYPE = np.dtype({"names": ["direction", "frequency", "amplitude", "phase", "sharpness"],
+                       "formats": [(np.float32, 2), np.float32, np.float32, np.float32, np.float32],
+                       "offsets": [0, 8, 12, 16, 20],
+                       "itemsize": 32})
+
+# Uniform buffer binding point of the Frame uniform block, which contains the
+# model view projection matrix and time elapsed shared by every mesh
+FRAME_BINDING = 0
+
+# Uniform buffer binding point of the Waves uniform block, which contains the
+# parameters of each Gerstner wave
+WAVES_BINDING = 1
+
+# OpenGL type of vertex attribute components stored as each NumPy data type
+VERTEX_ATTRIBUTE_TYPES = {np.dtype(np.float32): GL_FLOAT,
+                          np.dtype(np.float16): GL_HALF_FLOAT}
+
+
+def gerstner_wave_data():
+    """ Packs the parameters of each Gerstner wave for the Waves uniform block.
 
     Returns
     -------
-    matrix_array : np.ndarray
-        Matrix converted to an array.
-    
+    wave_data : np.ndarray, dtype=WAVE_DTYPE
+        Parameters of each wave in GERSTNER_WAVES.
+
     """
-    
-    matrix_array = np.array([matrix[i][j] for i in range(dimensions) for j in range(dimensions)])
 
-    return matrix_array
+    wave_data = np.zeros(len(GERSTNER_WAVES), dtype=WAVE_DTYPE)
+    for i, (frequency, amplitude, phase, sharpness, direction) in enumerate(GERSTNER_WAVES):
+        wave_data[i] = (direction, frequency, amplitude, phase, sharpness)
+
+    return wave_data
 
 
 def clamp(number, a, b):
-    """ Clamps a number within the range [a, b]. 
+    """ Clamps a number within the range [a, b]. Assumes a <= b.
     
     Parameters
     ----------
     number : float
-        Matrix to convert to an array
-    a : int
+        Number to clamp.
+    a : float
         Minimum of range (inclusive).
-    b : int
+    b : float
         Maximum of range (inclusive).
 
     Returns
@@ -48,7 +81,7 @@ def clamp(number, a, b):
     
     """
 
-    clamped_number = max(min(number, max(a, b)), min(a, b))
+    clamped_number = a if (number < a) else b if (number > b) else number
 
     return clamped_number
 
@@ -63,8 +96,8 @@ def read_bitmap(filename):
 
     Returns
     -------
-    bitmap_image : array[float]
-        Bitmap image
+    bitmap_image : np.ndarray, dtype=np.uint8
+        Bitmap image data
     width : int
         Width of image, in bytes
     height : int
@@ -80,9 +113,10 @@ def read_bitmap(filename):
 
         # Unpack all header data
         type = bmp.read(2).decode()                              # Type of image file
-        image_size = struct.unpack('I', bmp.read(4))[0]          # Filesize in bytes
-        struct.unpack('xxxxxxxx', bmp.read(8))                   # Skip 8 bytes
-        header_size = struct.unpack('I', bmp.read(4))[0]         # Header size, in bytes
+        struct.unpack('xxxx', bmp.read(4))                       # Skip filesize
+        struct.unpack('xxxx', bmp.read(4))                       # Skip 4 reserved bytes
+        data_offset = struct.unpack('I', bmp.read(4))[0]         # Offset of the image data, in bytes
+        struct.unpack('xxxx', bmp.read(4))                       # Skip header size
         width = struct.unpack('I', bmp.read(4))[0]               # Image width, in bytes
         height = struct.unpack('I', bmp.read(4))[0]              # Image height, in bytes
         struct.unpack('xx', bmp.read(2))                         # Skip 2 bytes
@@ -93,19 +127,29 @@ def read_bitmap(filename):
         if (type != "BM"):  # Bitmap image files always begin with "BM"
             raise ValueError("Incorrect file format. Must be a .bmp file.")
 
-        if (image_size == 0):  # Misformatted image size
-            image_size = width * height * 4   # x4 for each channel (R, G, B, A)
+        # Each row of pixels is padded to a multiple of 4 bytes
+        row_size = (width * bits_per_pixel + 31) // 32 * 4
+
+        # Read image data directly from the file into an array. Skips any header fields, color masks or palette before it
+        bmp.seek(data_offset)
+        bitmap_image = np.fromfile(bmp, dtype=np.uint8, count=row_size*height)
+
+    return bitmap_image, width, height
 
-        # Read image data
-        image_data = []
-        for byte in range(image_size):
-            image_data.append(int.from_bytes(bmp.read(1)))  # Read one byte
 
-    return image_data, width, height
+# NumPy data type corresponding to each PLY property type
+PLY_DATA_TYPES = {"char": "i1", "int8": "i1",
+                  "uchar": "u1", "uint8": "u1",
+                  "short": "i2", "int16": "i2",
+                  "ushort": "u2", "uint16": "u2",
+                  "int": "i4", "int32": "i4",
+                  "uint": "u4", "uint32": "u4",
+                  "float": "f4", "float32": "f4",
+                  "double": "f8", "float64": "f8"}
 
 
 def read_ply(filename):
-    """ Reads a PLY file.
+    """ Reads a PLY file, in either ASCII or binary format.
 
     Parameters
     ----------
@@ -131,104 +175,719 @@ def read_ply(filename):
     directory = os.path.dirname(os.path.abspath(__file__))
     filepath = os.path.join(directory, filename)
 
-    with open(filepath, "r") as file:
+    with open(filepath, "rb") as file:
 
         # Read formatting and comments
-        filetype = file.readline().strip("\n")
-        format = file.readline().strip("\n")
-        comment = file.readline().strip("\n")
+        filetype = file.readline().decode().strip()
+        format = file.readline().decode().split()[1]  # Either ascii, binary_little_endian or binary_big_endian
+        comment = file.readline().decode().strip()
 
         # Read number of vertices
-        line = file.readline().strip().split(" ")
+        line = file.readline().decode().split()
         num_vertices = int(line[2])
 
-        # Create empty arrays to store each vertex's attributes
-        vertex_data = {"x" : np.empty(num_vertices),
-                       "y" : np.empty(num_vertices),
-                       "z" : np.empty(num_vertices),
-                       "nx" : np.empty(num_vertices),
-                       "ny" : np.empty(num_vertices),
-                       "nz" : np.empty(num_vertices),
-                       "r" : np.empty(num_vertices),
-                       "g" : np.empty(num_vertices),
-                       "b" : np.empty(num_vertices),
-                       "u" : np.empty(num_vertices),
-                       "v" : np.empty(num_vertices)}
-
-        # Determine which value in each vertex data line corresponds to each attribute
-        attribute_indices = {}  # Stores each index in the line and the attribute it corresponds to
-        line_num = 0  # Used to iterate until the end of the vertex property information
-        while (line_num < len(vertex_data)): 
-
-            line = file.readline().strip().split()  # Split the line's data into components
-
-            if (line[0] == "element"):  # Beginning of triangle face properties begin
-                break
-            else:
-                # Store the current position and its corresponding attribute
-                attribute_indices[line_num] = line[2]
-                line_num += 1
+        # Determine the data type of each attribute in the vertex data, in order
+        attribute_types = []  # Stores each attribute and its data type
+        line = file.readline().decode().split()
+        while (line[0] == "property"):  # Vertex properties end where the triangle face properties begin
+            attribute_types.append((line[2], PLY_DATA_TYPES[line[1]]))
+            line = file.readline().decode().split()
 
         # Read number of faces
         num_faces = int(line[2])
 
-        # Skip format of triangle faces and end of header
-        next(file)
+        # Read data types of the number of indices and the indices in each face
+        line = file.readline().decode().split()
+        count_type = PLY_DATA_TYPES[line[2]]
+        index_type = PLY_DATA_TYPES[line[3]]
+
+        # Skip end of header
         next(file)
 
-        # Read vertex data from file
-        for index in range(num_vertices):  # Iterate over each vertex
+        if (format == "ascii"):
+
+            # Read vertex data and triangle face indices from file
+            vertex_data = np.loadtxt(file, dtype=np.float32, max_rows=num_vertices, ndmin=2)
+            face_data = np.loadtxt(file, dtype=np.uint32, max_rows=num_faces, ndmin=2)
 
-            vertex = file.readline().strip().split(" ")  # Split the line's data into components
+            # View the values of each attribute, stored as a column of the vertex data
+            vertex_columns = {attribute: vertex_data[:, column] for column, (attribute, _) in enumerate(attribute_types)}
 
-            for i in range(len(vertex)):  # Iterate over each attribute
+            # Drop the number of indices at the start of each face
+            indices = face_data[:, 1:].reshape(-1)
 
-                attribute = attribute_indices[i]  # Lookup which attribute the value in this position corrresponds to
-                vertex_data[attribute][index] = float(vertex[i])  # Add attribute to correct list
+        else:
 
+            # Define layout of each vertex and triangle face in the file
+            byte_order = "<" if (format == "binary_little_endian") else ">"
+            vertex_dtype = np.dtype([(attribute, byte_order + data_type) for attribute, data_type in attribute_types])
+            face_dtype = np.dtype([("count", byte_order + count_type), ("indices", byte_order + index_type, (3,))])
 
-        # Read triangle face indices from file
-        indices = []
-        for line in range(num_faces):  # Repeat until all faces have been read
+            # Read vertex data and triangle face indices from file in a single call each
+            vertex_data = np.fromfile(file, dtype=vertex_dtype, count=num_vertices)
+            face_data = np.fromfile(file, dtype=face_dtype, count=num_faces)
 
-            # Read indices from file
-            face = file.readline().strip().split(" ")   # Split line to separate indices
-            indices.extend([int(i) for i in face[1:]])  # Convert each index to an integer and add to list
+            # View the values of each attribute, stored as a field of the vertex data
+            vertex_columns = {attribute: vertex_data[attribute] for attribute, _ in attribute_types}
+
+            indices = face_data["indices"].astype(np.uint32, copy=False).reshape(-1)
 
 
     # Create arrays of each vertex attribute
-    positions = []
-    normals = []
-    colors = []
-    texture_coords = []
-    for i in range(num_vertices):
+    positions = _select_columns(vertex_columns, num_vertices, ("x", "y", "z"), np.float32)
+    normals = _select_columns(vertex_columns, num_vertices, ("nx", "ny", "nz"), np.float32)
+    colors = _select_columns(vertex_columns, num_vertices, ("r", "g", "b"), np.uint32)
+    texture_coords = _select_columns(vertex_columns, num_vertices, ("u", "v"), np.float32)
+
+    return positions, normals, colors, texture_coords, indices
+
+
+def _select_columns(vertex_columns, num_vertices, attributes, dtype):
+    """ Interleaves the values of the given attributes into a single array.
+
+    The array is allocated once and each attribute's values are copied
+    directly into it, converting them to the requested data type.
+
+    Parameters
+    ----------
+    vertex_columns : dict
+        Values of each attribute in the vertex data, one per vertex.
+    num_vertices : int
+        Number of vertices.
+    attributes : tuple[str]
+        Attributes to select, in order.
+    dtype : type
+        Data type of the returned array.
+
+    Returns
+    -------
+    attribute_data : np.ndarray
+        Interleaved values of the attributes for each vertex. Empty if any
+        attribute has no data in the file.
+
+    """
+
+    if not all(attribute in vertex_columns for attribute in attributes):
+        return np.empty(0, dtype=dtype)
+
+    attribute_data = np.empty((num_vertices, len(attributes)), dtype=dtype)
+    for i, attribute in enumerate(attributes):
+        attribute_data[:, i] = vertex_columns[attribute]
+
+    return attribute_data.reshape(-1)
+
+
+def gl_supports(version, extension):
+    """ Checks whether the current OpenGL context supports a feature, either
+    as part of the core profile or through an extension.
+
+    Parameters
+    ----------
+    version : tuple[int]
+        Major and minor OpenGL version the feature became part of the core
+        profile.
+    extension : str
+        Name of the extension providing the feature.
+
+    Returns
+    -------
+    supported : bool
+        Whether the feature is supported.
+
+    """
+
+    supported = bool(hasGLExtension("GL_VERSION_GL_%d_%d" % version) or hasGLExtension(extension))
+
+    return supported
+
+
+def read_shader_files(filenames):
+    """ Reads the source code of multiple shaders. The files are read
+    concurrently, and only the first time they are requested.
+
+    Parameters
+    ----------
+    filenames : list[str]
+        Filepath to each shader source code file.
+
+    Returns
+    -------
+    shader_codes : list[str]
+        Source code of each shader, in the same order as the filenames.
+
+    """
+
+    # Get filepath to each file
+    directory = os.path.dirname(os.path.abspath(__file__))
+    filepaths = [os.path.join(directory, filename) for filename in filenames]
+
+    with ThreadPoolExecutor(max_workers=len(filepaths)) as executor:
+        shader_codes = list(executor.map(_read_text_file, filepaths))
+
+    return shader_codes
+
+
+@functools.lru_cache(maxsize=None)
+def _read_text_file(filepath):
+    """ Reads the full contents of a text file. The contents are kept in
+    memory, so each file is only read from disk once.
+
+    Parameters
+    ----------
+    filepath : str
+        Filepath to the file.
+
+    Returns
+    -------
+    contents : str
+        Contents of the file.
+
+    """
+
+    with open(filepath, "r") as file:
+        contents = file.read()
+
+    return contents
+
+
+def create_buffer(data):
+    """ Creates a buffer object containing data that does not change.
+
+    Immutable storage is used when it is supported, so the driver is free to
+    place the buffer in the most suitable memory. With direct state access the
+    buffer is created without being bound. Otherwise, the data is uploaded
+    through the GL_COPY_WRITE_BUFFER target, so existing bindings (such as the
+    element buffer of the bound vertex array object) are unaffected.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Data to store in the buffer.
+
+    Returns
+    -------
+    buffer_ID : int
+        Integer ID of the buffer object.
+
+    """
+
+    # Pass a raw pointer to contiguous data, skipping PyOpenGL's array conversion
+    data = np.ascontiguousarray(data)
+    pointer = data.ctypes.data_as(ctypes.c_void_p)
+
+    if gl_supports((4, 5), "GL_ARB_direct_state_access"):  # Create and fill buffer without binding it
+        buffer_IDs = np.zeros(1, dtype=np.uint32)
+        glCreateBuffers(1, buffer_IDs)
+        glNamedBufferStorage(buffer_IDs[0], data.nbytes, pointer, 0)
+        return int(buffer_IDs[0])
+
+    buffer_ID = glGenBuffers(1)
+    glBindBuffer(GL_COPY_WRITE_BUFFER, buffer_ID)
+
+    if gl_supports((4, 4), "GL_ARB_buffer_storage"):
+        glBufferStorage(GL_COPY_WRITE_BUFFER, data.nbytes, pointer, 0)  # No flags, as buffer is never modified
+    else:
+        glBufferData(GL_COPY_WRITE_BUFFER, data.nbytes, pointer, GL_STATIC_DRAW)
+
+    glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+
+    return buffer_ID
+
+
+def bind_uniform_block(program_ID, block_name, binding):
+    """ Associates a shader program's uniform block with a uniform buffer
+    binding point.
+
+    Parameters
+    ----------
+    program_ID : int
+        Integer ID of shader program.
+    block_name : str
+        Name of the uniform block in the shader program.
+    binding : int
+        Uniform buffer binding point.
+
+    """
+
+    block_index = glGetUniformBlockIndex(program_ID, block_name)
+    glUniformBlockBinding(program_ID, block_index, binding)
+
+
+def set_vertex_attributes(buffer_ID, vertex_dtype, attributes):
+    """ Specifies the layout of interleaved vertex attributes stored in a
+    buffer, for the bound vertex array object.
+
+    When separate attribute formats are supported, the format of each
+    attribute is described once and the buffer is attached to a single
+    binding point. Otherwise, an attribute pointer is set for each attribute.
+
+    Parameters
+    ----------
+    buffer_ID : int
+        Integer ID of the buffer containing the vertex data.
+    vertex_dtype : np.dtype
+        Layout of each vertex. Every field is an array of 16 or 32-bit
+        floats.
+    attributes : list[tuple]
+        Attribute number, name of the field in the vertex layout, and whether
+        the values are normalized, for each attribute.
+
+    """
+
+    stride = vertex_dtype.itemsize  # Byte offset between consecutive vertices
+
+    if gl_supports((4, 3), "GL_ARB_vertex_attrib_binding"):
+
+        # Attach buffer to binding point 0, read by every attribute
+        glBindVertexBuffer(0, buffer_ID, 0, stride)
+
+        for attribute, field, normalized in attributes:
+            field_dtype, offset = vertex_dtype.fields[field][:2]
+            glEnableVertexAttribArray(attribute)
+            glVertexAttribFormat(attribute, field_dtype.shape[0], VERTEX_ATTRIBUTE_TYPES[field_dtype.base], normalized, offset)
+            glVertexAttribBinding(attribute, 0)
+
+    else:
+        glBindBuffer(GL_ARRAY_BUFFER, buffer_ID)
+
+        for attribute, field, normalized in attributes:
+            field_dtype, offset = vertex_dtype.fields[field][:2]
+            glEnableVertexAttribArray(attribute)
+            glVertexAttribPointer(attribute, field_dtype.shape[0], VERTEX_ATTRIBUTE_TYPES[field_dtype.base], normalized, stride, ctypes.c_void_p(offset))
+
+
+def create_texture(image, width, height, pixel_format, layers=None):
+    """ Creates a texture object containing an image that does not change, and
+    generates its mipmaps. The texture is sampled with trilinear filtering, and
+    anisotropic filtering when it is supported.
+
+    With direct state access, the texture is created and filled without being
+    bound. Otherwise, immutable storage is allocated for all mipmap levels when
+    it is supported.
+
+    Parameters
+    ----------
+    image : np.ndarray, dtype=np.uint8
+        Pixel data. Contains every layer when creating a texture array.
+    width : int
+        Width of the image, in pixels.
+    height : int
+        Height of the image, in pixels.
+    pixel_format : int
+        Format of the pixel data, either GL_BGR or GL_BGRA.
+    layers : int, optional
+        Number of layers. A texture array is created if given, otherwise a 2D
+        texture.
+
+    Returns
+    -------
+    texture_ID : int
+        Integer ID of the texture object.
+
+    """
+
+    internal_format = GL_RGBA8 if (pixel_format == GL_BGRA) else GL_RGB8
+    mipmap_levels = int(np.log2(max(width, height))) + 1
+    target = GL_TEXTURE_2D if (layers is None) else GL_TEXTURE_2D_ARRAY
+
+    # Sample up to 8 texels along the direction of anisotropy, if supported
+    anisotropy = 1.0
+    if gl_supports((4, 6), "GL_EXT_texture_filter_anisotropic"):
+        anisotropy = min(8.0, glGetFloatv(GL_MAX_TEXTURE_MAX_ANISOTROPY))
+
+    if gl_supports((4, 5), "GL_ARB_direct_state_access"):  # Create and fill texture without binding it
+        texture_IDs = np.zeros(1, dtype=np.uint32)
+        glCreateTextures(target, 1, texture_IDs)
+        texture_ID = int(texture_IDs[0])
+
+        if (layers is None):
+            glTextureStorage2D(texture_ID, mipmap_levels, internal_format, width, height)
+            glTextureSubImage2D(texture_ID, 0, 0, 0, width, height, pixel_format, GL_UNSIGNED_BYTE, image)
+        else:
+            glTextureStorage3D(texture_ID, mipmap_levels, internal_format, width, height, layers)
+            glTextureSubImage3D(texture_ID, 0, 0, 0, 0, width, height, layers, pixel_format, GL_UNSIGNED_BYTE, image)
+        glGenerateTextureMipmap(texture_ID)
+
+        # Set filtering
+        glTextureParameteri(texture_ID, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+        glTextureParameteri(texture_ID, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        if (anisotropy > 1.0):
+            glTextureParameterf(texture_ID, GL_TEXTURE_MAX_ANISOTROPY, anisotropy)
+
+        return texture_ID
+
+    texture_ID = glGenTextures(1)
+    glBindTexture(target, texture_ID)
+
+    if (layers is None):
+        if gl_supports((4, 2), "GL_ARB_texture_storage"):  # Allocate immutable storage for all mipmap levels, then upload base level
+            glTexStorage2D(target, mipmap_levels, internal_format, width, height)
+            glTexSubImage2D(target, 0, 0, 0, width, height, pixel_format, GL_UNSIGNED_BYTE, image)
+        else:
+            glTexImage2D(target, 0, internal_format, width, height, 0, pixel_format, GL_UNSIGNED_BYTE, image)
+    else:
+        if gl_supports((4, 2), "GL_ARB_texture_storage"):
+            glTexStorage3D(target, mipmap_levels, internal_format, width, height, layers)
+            glTexSubImage3D(target, 0, 0, 0, 0, width, height, layers, pixel_format, GL_UNSIGNED_BYTE, image)
+        else:
+            glTexImage3D(target, 0, internal_format, width, height, layers, 0, pixel_format, GL_UNSIGNED_BYTE, image)
+
+    glGenerateMipmap(target)
+
+    # Set filtering
+    glTexParameteri(target, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    glTexParameteri(target, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    if (anisotropy > 1.0):
+        glTexParameterf(target, GL_TEXTURE_MAX_ANISOTROPY, anisotropy)
+
+    glBindTexture(target, 0)
+
+    return texture_ID
+
+
+def specialize_shader(shader_code, constants):
+    """ Specializes shader source code by defining the given constants as
+    macros, directly after the version directive.
+
+    Baking values into the source lets the driver fold them into the compiled
+    shader. Since programs are cached by their source code, each set of values
+    is compiled once.
+
+    Parameters
+    ----------
+    shader_code : str
+        Shader source code.
+    constants : dict
+        Value of each constant, keyed by the name of the macro to define.
+
+    Returns
+    -------
+    specialized_code : str
+        Shader source code with the constants defined.
+
+    """
+
+    defines = "".join("\n#define %s %s" % (name, value) for name, value in constants.items())
+    specialized_code = re.sub(r"^#version.*$", lambda version: version.group(0) + defines, shader_code, count=1, flags=re.MULTILINE)
+
+    return specialized_code
+
+
+# Errors raised when reading a cached file that is incomplete or corrupted
+CACHE_ERRORS = (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile, struct.error)
 
-        positions.extend((vertex_data['x'][i],        # Vertex position
-                          vertex_data['y'][i], 
-                          vertex_data['z'][i]))
 
-        normals.extend((vertex_data['nx'][i],         # Normal
-                        vertex_data['ny'][i], 
-                        vertex_data['nz'][i]))
+def cache_filepath(name, key, extension):
+    """ Gets the filepath to a file in the cache directory.
+
+    Parameters
+    ----------
+    name : str
+        Name of the source of the cached data, such as its filepath. Each
+        source has a single entry in the cache.
+    key : str
+        Value uniquely identifying the current version of the cached data.
+    extension : str
+        File extension.
+
+    Returns
+    -------
+    filepath : str
+        Filepath to the cached file.
+
+    """
+
+    # Get filepath to cache directory
+    directory = os.path.dirname(os.path.abspath(__file__))
+    cache_directory = os.path.join(directory, CACHE_DIRECTORY)
+
+    # Filename is the hashed name followed by the hashed key
+    filename = hashlib.md5(name.encode()).hexdigest() + "-" + hashlib.md5(key.encode()).hexdigest() + extension
+    filepath = os.path.join(cache_directory, filename)
+
+    return filepath
 
-        colors.extend((vertex_data['r'][i],           # Color
-                       vertex_data['g'][i],
-                       vertex_data['b'][i]))
 
-        texture_coords.extend((vertex_data['u'][i],   # Texture coordinates
-                               vertex_data['v'][i]))
+def write_cache_file(filepath, write):
+    """ Writes a file in the cache directory, replacing the entry of any
+    previous version of the same source. The cache directory is created if it
+    does not exist.
 
+    The data is written to a temporary file first, then moved into place, so
+    an interrupted write never leaves an incomplete entry behind. If the cache
+    cannot be written to, such as on a read-only or full disk, the data is not
+    cached.
 
-    # Convert to arrays
-    with warnings.catch_warnings():
-        
-        # Ignore warnings from arrays with no data in the file
-        warnings.simplefilter("ignore", category=RuntimeWarning)
+    Parameters
+    ----------
+    filepath : str
+        Filepath to the cached file, as given by cache_filepath.
+    write : callable
+        Function writing the data to the open binary file it is given.
+
+    """
 
-        positions = np.array(positions, dtype=np.float32)
-        normals = np.array(normals, dtype=np.float32)
-        colors = np.array(colors, dtype=np.uint32)
-        texture_coords = np.array(texture_coords, dtype=np.float32)
-        indices = np.array(indices, dtype=np.uint32)
+    cache_directory, filename = os.path.split(filepath)
+
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        file_descriptor, temp_filepath = tempfile.mkstemp(suffix=".tmp", dir=cache_directory)
+    except OSError:  # Cache is not writable
+        return
+
+    # Write to a temporary file, then replace the cached file in one step
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            write(file)
+        os.replace(temp_filepath, filepath)
+    except OSError:  # Cache is not writable
+        remove_cache_file(temp_filepath)
+        return
+    except BaseException:
+        remove_cache_file(temp_filepath)
+        raise
+
+    # Remove finished entries of previous versions, which share the hashed name. Temporary files may still be in use
+    name_prefix = filename.split("-")[0] + "-"
+    try:
+        entries = os.listdir(cache_directory)
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.startswith(name_prefix) and (entry != filename) and not entry.endswith(".tmp"):
+            remove_cache_file(os.path.join(cache_directory, entry))
+
+
+def remove_cache_file(filepath):
+    """ Removes a file from the cache directory, if it still exists.
+
+    Parameters
+    ----------
+    filepath : str
+        Filepath to the cached file.
+
+    """
+
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
+
+
+def load_ply(filename):
+    """ Reads a PLY file. The parsed data is cached, and reused on subsequent
+    calls until the file is modified.
+
+    Parameters
+    ----------
+    filename : str
+        Filepath to a PLY file.
+
+    Returns
+    -------
+    positions : np.ndarray, dtype=np.float32
+        Vertex positions
+    normals : np.ndarray, dtype=np.float32
+        Vertex normals
+    colors : np.ndarray, dtype=np.uint32
+        Vertex colors
+    texture_coords : np.ndarray, dtype=np.float32
+        Vertex texture coordinates
+    indices : np.ndarray, dtype=np.uint32
+        Indices of each face in the mesh.
+
+    """
+
+    # Get filepath to file
+    directory = os.path.dirname(os.path.abspath(__file__))
+    filepath = os.path.join(directory, filename)
+
+    # Cached data is identified by the file and the time it was last modified
+    cache_file = cache_filepath(filepath, str(os.path.getmtime(filepath)), ".npz")
+
+    if os.path.exists(cache_file):  # Load cached data
+        try:
+            with np.load(cache_file) as data:
+                return data["positions"], data["normals"], data["colors"], data["texture_coords"], data["indices"]
+        except CACHE_ERRORS:  # Cached file is corrupted, read the file again
+            remove_cache_file(cache_file)
+
+    # Read and cache the file
+    positions, normals, colors, texture_coords, indices = read_ply(filename)
+    write_cache_file(cache_file, lambda file: np.savez(file, positions=positions, normals=normals, colors=colors, texture_coords=texture_coords, indices=indices))
 
     return positions, normals, colors, texture_coords, indices
+
+
+def begin_program(name, shaders):
+    """ Starts building a shader program.
+
+    If the program has been built before, the linked program is loaded from
+    the cache. Otherwise, each shader is compiled and the program is linked
+    without waiting for the result. Drivers supporting
+    ARB_parallel_shader_compile then build the program on background threads,
+    while the caller does other work. finish_program must be called before the
+    program is used.
+
+    Parameters
+    ----------
+    name : str
+        Name of the program, identifying its entry in the cache.
+    shaders : list[tuple]
+        Type (such as GL_VERTEX_SHADER) and source code of each shader in the
+        program.
+
+    Returns
+    -------
+    program_ID : int
+        Integer ID of shader program.
+
+    """
+
+    program_ID = glCreateProgram()
+
+    # Programs are cached by their combined source code
+    if load_program_binary(program_ID, name, "".join(shader_code for _, shader_code in shaders)):
+        return program_ID
+
+    # Compile and attach each shader
+    for shader_type, shader_code in shaders:
+        shader_ID = glCreateShader(shader_type)
+        glShaderSource(shader_ID, shader_code)
+        glCompileShader(shader_ID)
+        glAttachShader(program_ID, shader_ID)
+
+    glLinkProgram(program_ID)
+
+    return program_ID
+
+
+def finish_program(program_ID, name, shaders):
+    """ Finishes building a shader program started by begin_program.
+
+    Waits for the program to finish compiling and linking, and checks for
+    errors. Each shader's compile status is only checked in debug runs (without
+    python -O), as a failed compile also causes linking to fail. The shaders
+    are then deleted, and the linked program is cached.
+
+    Parameters
+    ----------
+    program_ID : int
+        Integer ID of shader program.
+    name : str
+        Name of the program, as given to begin_program.
+    shaders : list[tuple]
+        Type and source code of each shader in the program, as given to
+        begin_program.
+
+    """
+
+    shader_IDs = glGetAttachedShaders(program_ID)
+    if (len(shader_IDs) == 0):  # Program was loaded from the cache
+        return
+
+    # Check for compilation errors, to report the log of the failing shader. Blocks until the shader has been compiled
+    if __debug__:
+        for shader_ID in shader_IDs:
+            if not(glGetShaderiv(shader_ID, GL_COMPILE_STATUS)):
+                raise RuntimeError(glGetShaderInfoLog(shader_ID))
+
+    # Check for linking error
+    if not(glGetProgramiv(program_ID, GL_LINK_STATUS)):
+        raise RuntimeError(glGetProgramInfoLog(program_ID))
+
+    # Unlink shader program
+    for shader_ID in shader_IDs:
+        glDetachShader(program_ID, shader_ID)
+        glDeleteShader(shader_ID)
+
+    # Cache linked program for subsequent runs
+    save_program_binary(program_ID, name, "".join(shader_code for _, shader_code in shaders))
+
+
+def load_program_binary(program_ID, name, key):
+    """ Loads a linked shader program from the cache.
+
+    If the program cannot be loaded, the program is marked as retrievable so
+    its binary can be cached by save_program_binary once it has been compiled
+    and linked from source.
+
+    Parameters
+    ----------
+    program_ID : int
+        Integer ID of the shader program to load the binary into.
+    name : str
+        Name of the program, identifying its entry in the cache.
+    key : str
+        Value uniquely identifying the program, such as its shader source codes.
+
+    Returns
+    -------
+    loaded : bool
+        Whether the program was loaded and linked successfully.
+
+    """
+
+    if not gl_supports((4, 1), "GL_ARB_get_program_binary"):  # Program binaries are unavailable
+        return False
+
+    cache_file = cache_filepath(name, key, ".bin")
+
+    loaded = False
+    if os.path.exists(cache_file):
+
+        # Read binary format and program binary
+        try:
+            with open(cache_file, "rb") as file:
+                binary_format = struct.unpack('I', file.read(4))[0]
+                binary = np.fromfile(file, dtype=np.uint8)
+        except CACHE_ERRORS:  # Cached file is corrupted, build the program from source
+            remove_cache_file(cache_file)
+            binary = None
+
+        # Load program. Fails if the driver has changed since the binary was cached
+        if binary is not None:
+            try:
+                glProgramBinary(program_ID, binary_format, binary, binary.size)
+                loaded = bool(glGetProgramiv(program_ID, GL_LINK_STATUS))
+            except GLError:  # Binary format is not supported by the current driver
+                remove_cache_file(cache_file)
+
+    if not loaded:  # Allow binary to be retrieved after linking
+        glProgramParameteri(program_ID, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+
+    return loaded
+
+
+def save_program_binary(program_ID, name, key):
+    """ Saves a linked shader program to the cache, to be loaded by
+    load_program_binary.
+
+    Parameters
+    ----------
+    program_ID : int
+        Integer ID of a linked shader program.
+    name : str
+        Name of the program, identifying its entry in the cache.
+    key : str
+        Value uniquely identifying the program, such as its shader source codes.
+
+    """
+
+    if not gl_supports((4, 1), "GL_ARB_get_program_binary"):  # Program binaries are unavailable
+        return
+
+    # Get program binary
+    binary_length = glGetProgramiv(program_ID, GL_PROGRAM_BINARY_LENGTH)
+    if (binary_length == 0):  # Driver does not provide any binary formats
+        return
+
+    length = np.zeros(1, dtype=np.int32)
+    binary_format = np.zeros(1, dtype=np.uint32)
+    binary = np.empty(binary_length, dtype=np.uint8)
+    glGetProgramBinary(program_ID, binary_length, length, binary_format, binary)
+
+    # Write binary format followed by program binary
+    data = struct.pack('I', binary_format[0]) + binary[:length[0]].tobytes()
+    write_cache_file(cache_filepath(name, key, ".bin"), lambda file: file.write(data))
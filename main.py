@@ -2,9 +2,13 @@
 # Author:  Joelene Hales
 
 from OpenGL.GL import *
+from OpenGL.GL.ARB.parallel_shader_compile import glMaxShaderCompilerThreadsARB
+from OpenGL.extensions import hasGLExtension
 import glfw
 import glm
+import struct
 from helpers import *
+from uniform_block import UniformBlock
 from water import Water
 from camera import Camera
 from boat import Boat
@@ -27,6 +31,18 @@ screen_height = 800
 window = glfw.create_window(screen_width, screen_height, "Wind Waker", None, None)
 glfw.make_context_current(window)
 
+# Allow the driver to compile shaders on background threads, if supported
+if hasGLExtension("GL_ARB_parallel_shader_compile"):
+    glMaxShaderCompilerThreadsARB(0xFFFFFFFF)  # Driver chooses the number of threads
+
+# Create uniform buffer shared by every mesh, containing the model view
+# projection matrix (64 bytes) and time elapsed, padded to 80 bytes (std140)
+frame_block = UniformBlock(FRAME_BINDING, 80)
+
+# Create uniform buffer containing the parameters of each Gerstner wave, which do not change
+waves_buffer = create_buffer(gerstner_wave_data())
+glBindBufferBase(GL_UNIFORM_BUFFER, WAVES_BINDING, waves_buffer)
+
 # Create mesh objects
 water = Water(-10.0, 10.0, 1.0)
 boat = Boat()
@@ -54,6 +70,13 @@ glfw.set_input_mode(window, glfw.STICKY_KEYS, GL_TRUE)
 glEnable(GL_DEPTH_TEST)
 glDepthFunc(GL_LESS)
 
+# Enable blending for all meshes
+glEnable(GL_BLEND)
+glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+# Set background color
+glClearColor(0.2, 0.2, 0.3, 0.0)  # Dark blue
+
 
 # Initialize variables
 time = 0        # Used to make the waves ripple
@@ -63,13 +86,16 @@ dx = 0          # Distance mouse was dragged in each direction
 dy = 0
 dr = 0          # Proportional to time arrow key is held. Sign indicates direction
 
+# Set initial view and model view projection matrices. Only recalculated when the camera moves
+V = glm.lookAt(camera.getCenter(), camera.getEye(), camera.getUp())
+MVP = P * V * M
+
 
 # Render loop
 while (glfw.get_key(window, glfw.KEY_ESCAPE) != glfw.PRESS and not glfw.window_should_close(window)):  # Repeat until escape key is pressed or window is closed
 
-    # Clear buffers and set background color
+    # Clear buffers
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    glClearColor(0.2, 0.2, 0.3, 0.0)  # Dark blue
     
 
     # Increment time
@@ -112,24 +138,26 @@ while (glfw.get_key(window, glfw.KEY_ESCAPE) != glfw.PRESS and not glfw.window_s
         dy = 0
 
 
-    # Adjust camera position
-    camera.zoomRadius(dr)            # Modify radius based on arrow press
-    camera.rotateTheta(0.005 * dx)   # Modify theta based on horizontal drag motion
-    camera.rotatePhi(-0.005 * dy)    # Modify phi based on vertical drag motion
+    # Adjust camera position, if there was any input
+    if (dr or dx or dy):
+        camera.zoomRadius(dr)            # Modify radius based on arrow press
+        camera.rotateTheta(0.005 * dx)   # Modify theta based on horizontal drag motion
+        camera.rotatePhi(-0.005 * dy)    # Modify phi based on vertical drag motion
 
-    # Set view matrix to use new camera position
-    V = glm.lookAt(camera.getCenter(), camera.getEye(), camera.getUp())
+        # Set view and model view projection matrices to use new camera position
+        V = glm.lookAt(camera.getCenter(), camera.getEye(), camera.getUp())
+        MVP = P * V * M
 
-    # Calculate model view projection matrix
-    MVP = P * V * M
+    # Update uniforms shared by every mesh
+    frame_block.update(MVP.to_bytes() + struct.pack("f", time))
 
     # Render each mesh
-    water.draw(MVP, V, M, time, light_direction)
-    boat.draw(MVP, time)
+    water.draw(V, M, light_direction)
+    boat.draw()
+    frame_block.fence()
 
     # Swap buffers
     glfw.swap_buffers(window)
-    glfw.poll_events()
 
 
 # Close OpenGL window and terminate GLFW
@@ -0,0 +1,142 @@
+# Class storing uniform values shared between shader programs in a uniform buffer.
+# Author:  Joelene Hales
+
+from OpenGL.GL import *
+import ctypes
+from helpers import *
+
+
+class UniformBlock():
+    """ Uniform buffer object backing a uniform block shared by several shader
+    programs.
+
+    The buffer is bound to a fixed binding point, which each shader program
+    associates with its uniform block of the same layout using
+    bind_uniform_block. Updating the buffer once therefore updates the uniforms
+    of every program using it. When persistent mapping is supported, the buffer
+    stays mapped for its whole lifetime and is written to directly. It is then
+    split into a ring of slots, one used per frame, and the slot in use is
+    bound to the binding point. A fence is placed after the commands reading
+    each slot, so a slot is only overwritten once the frame that used it has
+    finished, while the following frames use the other slots.
+
+    Attributes
+    ----------
+    binding : int
+        Uniform buffer binding point the buffer is bound to.
+    size : int
+        Size of the uniform block, in bytes.
+    buffer_ID : int
+        Integer ID of the uniform buffer object.
+    pointer : int or None
+        Address of the persistently mapped buffer, or None if the buffer is
+        updated using glBufferSubData.
+    slot_size : int
+        Size of each slot, rounded up to the uniform buffer offset alignment.
+    slot : int
+        Index of the slot written to in the current frame.
+    syncs : list
+        Fence placed after the last commands reading each slot, or None.
+
+    Methods
+    -------
+    update(data, offset=0):
+        Writes data to the buffer.
+    fence():
+        Marks the end of the commands reading the current slot, and moves on to
+        the next slot.
+
+    """
+
+    def __init__(self, binding, size, num_slots=3):
+        """ Creates the uniform buffer object and binds it to a binding point.
+
+        Parameters
+        ----------
+        binding : int
+            Uniform buffer binding point.
+        size : int
+            Size of the uniform block, in bytes.
+        num_slots : int, optional
+            Number of frames that may use the buffer at once, when it is
+            persistently mapped.
+
+        """
+
+        self.binding = binding
+        self.size = size
+        self.pointer = None
+        self.slot_size = size
+        self.slot = 0
+        self.syncs = [None]
+
+        self.buffer_ID = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.buffer_ID)
+
+        if gl_supports((4, 4), "GL_ARB_buffer_storage"):
+
+            # Round each slot up, so every slot starts at a valid offset for glBindBufferRange
+            alignment = int(glGetIntegerv(GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT))
+            self.slot_size = -(-size // alignment) * alignment
+            self.syncs = [None] * num_slots
+
+            # Map buffer once, writes are visible to the GPU without flushing
+            flags = GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | GL_MAP_COHERENT_BIT
+            glBufferStorage(GL_UNIFORM_BUFFER, self.slot_size * num_slots, None, flags)
+            self.pointer = glMapBufferRange(GL_UNIFORM_BUFFER, 0, self.slot_size * num_slots, flags)
+
+        else:
+            glBufferData(GL_UNIFORM_BUFFER, size, None, GL_DYNAMIC_DRAW)
+
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+        glBindBufferRange(GL_UNIFORM_BUFFER, self.binding, self.buffer_ID, 0, self.size)
+
+
+    def update(self, data, offset=0):
+        """ Writes data to the current slot of the buffer, and binds that slot.
+
+        Parameters
+        ----------
+        data : bytes
+            Data to write, laid out according to the std140 layout of the
+            uniform block.
+        offset : int, optional
+            Offset into the buffer to write the data at, in bytes.
+
+        """
+
+        if self.pointer is None:
+            glBindBuffer(GL_UNIFORM_BUFFER, self.buffer_ID)
+            glBufferSubData(GL_UNIFORM_BUFFER, offset, len(data), data)
+            glBindBuffer(GL_UNIFORM_BUFFER, 0)
+            return
+
+        # Wait until the frame that last used this slot has finished reading it
+        sync = self.syncs[self.slot]
+        if sync is not None:
+            glClientWaitSync(sync, GL_SYNC_FLUSH_COMMANDS_BIT, GL_TIMEOUT_IGNORED)
+            glDeleteSync(sync)
+            self.syncs[self.slot] = None
+
+        slot_offset = self.slot * self.slot_size
+        ctypes.memmove(self.pointer + slot_offset + offset, data, len(data))
+
+        glBindBufferRange(GL_UNIFORM_BUFFER, self.binding, self.buffer_ID, slot_offset, self.size)
+
+
+    def fence(self):
+        """ Marks the end of the commands reading the current slot, and moves
+        on to the next slot. The next update of this slot waits for these
+        commands to finish.
+        """
+
+        if self.pointer is None:
+            return
+
+        # Replace any fence of this slot that was never waited on
+        if self.syncs[self.slot] is not None:
+            glDeleteSync(self.syncs[self.slot])
+
+        self.syncs[self.slot] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self.slot = (self.slot + 1) % len(self.syncs)
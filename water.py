@@ -2,21 +2,33 @@
 # Author:  Joelene Hales
 
 from OpenGL.GL import *
+import glm
 import numpy as np
 from helpers import *
 
 
+# Layout of the vertex attributes of each vertex. Normals are computed in the
+# tessellation evaluation shader, so only the position is stored
+VERTEX_DTYPE = np.dtype([("position", np.float32, 3)])
+
+# Compact layout, used when every coordinate is exact as a half float. The
+# position is padded to 4 components to keep it aligned
+HALF_VERTEX_DTYPE = np.dtype([("position", np.float16, 4)])
+
+
 class Water():
     """ Class generates and stores the data to render a patch of water.
     
     The patch of water is generated as a simple quad mesh, which is manipulated
-    using tessellation and geometry shaders to render it as a patch of water.
+    using tessellation shaders to render it as a patch of water.
     Vertex data is contained in a vertex array object and restored to
-    render the mesh. Tessellation uses an outer and inner tessellation level of
-    16 to generate additional vertices. The geometry shader displaces the
-    interpolated vertex positions by a superpositoin of 4 Gerstner waves at a
-    given moment in time. The water's color and the displacement map used to
-    manipulate the mesh are supplied as bitmap images.
+    render the mesh. Larger areas of water are covered by drawing instances of
+    the mesh as a grid of tiles. Tessellation uses an outer and inner
+    tessellation level of 16 to generate additional vertices. The tessellation
+    evaluation shader displaces the interpolated vertex positions by a
+    superpositoin of 4 Gerstner waves at a given moment in time. The water's
+    color and the displacement map used to manipulate the mesh are supplied as
+    bitmap images.
 
     Attributes
     ----------
@@ -27,9 +39,6 @@ class Water():
 	    the patch of water.
     texture_ID : int
         Integer ID of generated texture objects (water and displacement map).
-    MVP_uniform : int
-        Integer handle for model view projection matrix uniform variable in
-        shader program.
     V_uniform : int
         Integer handle for view matrix uniform variable in shader program.
     M_uniform : int
@@ -45,14 +54,16 @@ class Water():
         Integer handle for displacement map uniform variable in shader program.
     water_texture_uniform : int
         Integer handle for water texture image uniform variable in shader program.
-    time_uniform : int
-        Integer handle for time uniform variable in shader program.
     num_indices : int
         Number of indices in the mesh.
+    index_type : int
+        OpenGL type of the indices, GL_UNSIGNED_SHORT or GL_UNSIGNED_INT.
+    num_tiles : int
+        Number of tiles along each axis.
 
     Methods
     -------
-    draw(MVP, V, M, time, light_direction):
+    draw(V, M, light_direction):
         Renders the patch of water at a given moment in time.
     
     """
@@ -76,65 +87,58 @@ class Water():
         -------
         vertices : np.ndarray, dtype=np.float32
             Vertices in the mesh.
-        normals : np.ndarray, dtype=np.float32
-            Normal to each vertex.
-        indices : np.ndarray, dtype=np.uint32
-            Indices defining each quad in the mesh.
+        indices : np.ndarray, dtype=np.uint16 or np.uint32
+            Indices defining each quad in the mesh. 16 bit indices are used
+            when every vertex can be addressed by them.
+        size : float
+            Width of the mesh along x and z, a whole number of quads.
 
         
         """
         
-        # Initialize arrays to store each vertex attribute
-        vertices = []
-        normals = []
-        indices = []
-
-        y = 0  # Mesh in the xz plane
-
-        # Build the mesh
-        for z in np.arange(range_min, range_max+stepsize, stepsize):
-            for x in np.arange(range_min, range_max+stepsize, stepsize):
-                vertices.extend((x, y, z))
-                normals.extend((0,1,0))
+        # Vertices and quads in each row/column, computed up front to allocate the arrays once
+        num_columns = int(round((range_max - range_min) / stepsize)) + 1
+        num_quads = num_columns - 1
 
+        # Coordinates along each axis
+        coordinates = range_min + stepsize*np.arange(num_columns)
 
-        # Create list of vertex indices defining each quad in the mesh
-        num_quads = int((range_max - range_min) / stepsize)  # Quads in each row/column
-        num_columns = num_quads +1
-        
-        for x_i in range(num_quads):
-
-            for z_i in range(num_quads):
-                
-                # Define indices, in counter clockwise winding order
-                top_left = x_i*num_columns + z_i
-                top_right = x_i*num_columns + z_i + 1
-                bottom_right = (x_i+1)*num_columns + z_i + 1
-                bottom_left = (x_i+1)*num_columns + z_i
+        # Build the mesh, rows of increasing x for each z. Mesh in the xz plane
+        vertices = np.empty((num_columns, num_columns, 3), dtype=np.float32)
+        vertices[:, :, 0] = coordinates[np.newaxis, :]
+        vertices[:, :, 1] = 0
+        vertices[:, :, 2] = coordinates[:, np.newaxis]
 
-                indices.extend((top_left, top_right, bottom_right, bottom_left))
 
+        # Create array of vertex indices defining each quad in the mesh. Use the smallest index type that fits
+        index_dtype = np.uint16 if (num_columns*num_columns <= 65536) else np.uint32
+        indices = np.empty((num_quads, num_quads, 4), dtype=index_dtype)
+        quad = np.arange(num_quads, dtype=index_dtype)
 
-        # Convert to arrays
-        vertices = np.array(vertices, dtype=np.float32)
-        normals = np.array(normals, dtype=np.float32)
-        indices = np.array(indices, dtype=np.uint32)
+        # Define indices, in counter clockwise winding order
+        top_left = indices[:, :, 0]
+        top_left[:] = quad[:, np.newaxis]*num_columns + quad[np.newaxis, :]
+        indices[:, :, 1] = top_left + 1                # Top right
+        indices[:, :, 2] = top_left + num_columns + 1  # Bottom right
+        indices[:, :, 3] = top_left + num_columns      # Bottom left
 
-        return vertices, normals, indices
+        return vertices.reshape(-1), indices.reshape(-1), num_quads*stepsize
 
 
 
-    def __init__(self, range_min, range_max, stepsize):
+    def __init__(self, range_min, range_max, stepsize, num_tiles=1):
         """ Generates the mesh and initializes the shaders to create waves.
 
-        The simple quad mesh is manipulated using tessellation and geometry
-        shaders to render it as a patch of water. Vertex data is contained in a
-        vertex array object and restored to render the mesh. Tessellation uses
-        an outer and inner tessellation level of 16. The geometry shader
+        The simple quad mesh is manipulated using tessellation shaders to
+        render it as a patch of water. Vertex data is contained in a vertex
+        array object and restored to render the mesh. The mesh is drawn as a
+        grid of tiles, centered on the mesh. Tessellation uses an outer and
+        inner tessellation level of 16. The tessellation evaluation shader
         displaces the interpolated vertex positions by a superpositoin of 4
         Gerstner waves at a given moment in time. The water's color and the
         displacement map used to manipulate the mesh are supplied as bitmap
-        images.
+        images. The linked shader program is cached to speed up subsequent
+        runs.
         
         Parameters
         ----------
@@ -144,104 +148,40 @@ class Water():
             Maximum value of x and z in the generated mesh.
         stepsize : float
             Size of each quad.
+        num_tiles : int, optional
+            Number of tiles along each axis. Each tile is a copy of the mesh.
         
         """
 
+        self.num_tiles = num_tiles
+
         # Define directories to shader codes and texture images
         assets_directory = "Assets/"
         shader_directory = "Shaders/"
 
-        # Generate the quad mesh
-        vertices, normals, indices = self._generate_mesh(range_min, range_max, stepsize)
-
-        self.num_indices = int(len(indices))
-
-        
         # Import shader codes from file
-        vertex_shader = open(shader_directory+"water.vs", "r").read()
-        tessellation_control_shader = open(shader_directory+"water.tcs", "r").read()
-        tessellation_evaluation_shader = open(shader_directory+"water.tes", "r").read()
-        geometry_shader = open(shader_directory+"water.gs", "r").read()
-        fragment_shader = open(shader_directory+"water.fs", "r").read()
-
-
-        # Create vertex and fragment shaders
-        vertex_shader_ID = glCreateShader(GL_VERTEX_SHADER)
-        tessellation_control_shader_ID = glCreateShader(GL_TESS_CONTROL_SHADER)
-        tessellation_evaluation_shader_ID = glCreateShader(GL_TESS_EVALUATION_SHADER)
-        geometry_shader_ID = glCreateShader(GL_GEOMETRY_SHADER)
-        fragment_shader_ID = glCreateShader(GL_FRAGMENT_SHADER)
-
-        # Set shader source codes
-        glShaderSource(vertex_shader_ID, vertex_shader)
-        glShaderSource(tessellation_control_shader_ID, tessellation_control_shader)
-        glShaderSource(tessellation_evaluation_shader_ID, tessellation_evaluation_shader)
-        glShaderSource(geometry_shader_ID, geometry_shader)
-        glShaderSource(fragment_shader_ID, fragment_shader)
-        
-        
-        # Compile each shader
-        glCompileShader(vertex_shader_ID)
-        glCompileShader(tessellation_control_shader_ID)
-        glCompileShader(tessellation_evaluation_shader_ID)
-        glCompileShader(geometry_shader_ID)
-        glCompileShader(fragment_shader_ID)
-
-
-        # Check for compilation errors
-        if not(glGetShaderiv(vertex_shader_ID, GL_COMPILE_STATUS)):
-            raise RuntimeError(glGetShaderInfoLog(vertex_shader_ID))
-        if not(glGetShaderiv(tessellation_control_shader_ID, GL_COMPILE_STATUS)):
-            raise RuntimeError(glGetShaderInfoLog(tessellation_control_shader_ID))
-        if not(glGetShaderiv(tessellation_evaluation_shader_ID, GL_COMPILE_STATUS)):
-            raise RuntimeError(glGetShaderInfoLog(tessellation_evaluation_shader_ID))
-        if not(glGetShaderiv(geometry_shader_ID, GL_COMPILE_STATUS)):
-            raise RuntimeError(glGetShaderInfoLog(geometry_shader_ID))
-        if not(glGetShaderiv(fragment_shader_ID, GL_COMPILE_STATUS)):
-            raise RuntimeError(glGetShaderInfoLog(fragment_shader_ID))
-        
-
-        # Attach shaders and link shader program
-        self.program_ID = glCreateProgram()
-
-        glAttachShader(self.program_ID, vertex_shader_ID)
-        glAttachShader(self.program_ID, tessellation_control_shader_ID)
-        glAttachShader(self.program_ID, tessellation_evaluation_shader_ID)
-        glAttachShader(self.program_ID, geometry_shader_ID)
-        glAttachShader(self.program_ID, fragment_shader_ID)
-        glLinkProgram(self.program_ID)
-
-        # Check for linking error
-        if not(glGetProgramiv(self.program_ID, GL_LINK_STATUS)):
-            raise RuntimeError(glGetProgramInfoLog(self.program_ID))
+        shader_codes = read_shader_files([shader_directory+"water.vs",
+                                          shader_directory+"water.tcs",
+                                          shader_directory+"water.tes",
+                                          shader_directory+"water.fs"])
+        vertex_shader, tessellation_control_shader, tessellation_evaluation_shader, fragment_shader = shader_codes
 
+        # Define number of Gerstner waves. Their parameters are read from the Waves uniform block
+        tessellation_evaluation_shader = specialize_shader(tessellation_evaluation_shader, {"NUM_WAVES": len(GERSTNER_WAVES)})
 
-        # Unlink shader program
-        glDetachShader(self.program_ID, vertex_shader_ID)
-        glDetachShader(self.program_ID, tessellation_control_shader_ID)
-        glDetachShader(self.program_ID, tessellation_evaluation_shader_ID)
-        glDetachShader(self.program_ID, geometry_shader_ID)
-        glDetachShader(self.program_ID, fragment_shader_ID)
+        # Start building shader program. The driver may compile the shaders in the background while the mesh is created
+        shaders = [(GL_VERTEX_SHADER, vertex_shader),
+                   (GL_TESS_CONTROL_SHADER, tessellation_control_shader),
+                   (GL_TESS_EVALUATION_SHADER, tessellation_evaluation_shader),
+                   (GL_FRAGMENT_SHADER, fragment_shader)]
+        self.program_ID = begin_program("water", shaders)
 
-        glDeleteShader(vertex_shader_ID)
-        glDeleteShader(tessellation_control_shader_ID)
-        glDeleteShader(tessellation_evaluation_shader_ID)
-        glDeleteShader(geometry_shader_ID)
-        glDeleteShader(fragment_shader_ID)
-
-        glUseProgram(0)
 
+        # Generate the quad mesh
+        vertices, indices, tile_size = self._generate_mesh(range_min, range_max, stepsize)
 
-        # Get handle for each uniform variable
-        self.MVP_uniform = glGetUniformLocation(self.program_ID, "MVP")
-        self.V_uniform = glGetUniformLocation(self.program_ID, "V")
-        self.M_uniform = glGetUniformLocation(self.program_ID, "M")
-        self.light_direction_uniform = glGetUniformLocation(self.program_ID, "light_direction")
-        self.outer_tess_uniform = glGetUniformLocation(self.program_ID, "outerTess")
-        self.inner_tess_uniform = glGetUniformLocation(self.program_ID, "innerTess")
-        self.displacement_map_uniform = glGetUniformLocation(self.program_ID, "displacementTexture")
-        self.water_texture_uniform = glGetUniformLocation(self.program_ID, "waterTexture")
-        self.time_uniform = glGetUniformLocation(self.program_ID, "time")
+        self.num_indices = int(len(indices))
+        self.index_type = GL_UNSIGNED_SHORT if (indices.dtype == np.uint16) else GL_UNSIGNED_INT
 
 
         # Read bitmap files
@@ -249,93 +189,91 @@ class Water():
         displacement_map,displacement_width,displacement_height = read_bitmap(assets_directory+"displacement-map1.bmp")
 
 
-		# Generate textures
-        self.texture_ID = glGenTextures(2)   # One for water, one for displacement map
-
-        # Load water texture
-        glBindTexture(GL_TEXTURE_2D, self.texture_ID[0])
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, water_width, water_height, 0, GL_BGR, GL_UNSIGNED_BYTE, water_image)
-        glGenerateMipmap(GL_TEXTURE_2D)
-        glBindTexture(GL_TEXTURE_2D, 0)
-
-        # Load displacement map
-        glBindTexture(GL_TEXTURE_2D, self.texture_ID[1])
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, displacement_width, displacement_height, 0, GL_BGR, GL_UNSIGNED_BYTE, displacement_map)
-        glGenerateMipmap(GL_TEXTURE_2D)
-        glBindTexture(GL_TEXTURE_2D, 0)
+		# Generate textures, one for water, one for displacement map
+        self.texture_ID = [create_texture(water_image, water_width, water_height, GL_BGR),
+                           create_texture(displacement_map, displacement_width, displacement_height, GL_BGR)]
 
 
 		# Create and bind VAO
         self.VAO = glGenVertexArrays(1)
         glBindVertexArray(self.VAO)
 
-		# Create and bind VBO for vertex positions
-        vertex_VBO = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, vertex_VBO)
-        glBufferData(GL_ARRAY_BUFFER, np.dtype(np.float32).itemsize*len(vertices), vertices, GL_STATIC_DRAW)
+        # Store the mesh as half floats only if no coordinate changes, so quads never collapse
+        with np.errstate(over="ignore"):
+            exact = np.array_equal(vertices.astype(np.float16).astype(np.float32), vertices)
+        vertex_dtype = HALF_VERTEX_DTYPE if exact else VERTEX_DTYPE
+
+        vertex_data = np.zeros(len(vertices) // 3, dtype=vertex_dtype)
+        vertex_data["position"][:, :3] = vertices.reshape(-1, 3)
+
+        # Create VBO for vertex data
+        vertex_VBO = create_buffer(vertex_data)
 
         # Set vertex position attribute
-        glEnableVertexAttribArray(0)
-        glVertexAttribPointer(
-            0,            # Attribute number
-            3,            # Size (Number of components)
-            GL_FLOAT,     # Type
-            GL_FALSE,     # Normalized?
-            0,            # Stride (Byte offset)
-            None          # Offset
-        )
-
-        # Create and bind VBO for normal vectors
-        normal_VBO = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, normal_VBO)
-        glBufferData(GL_ARRAY_BUFFER, np.dtype(np.float32).itemsize*len(vertices), normals, GL_STATIC_DRAW)
-
-		# Set normal attribute
-        glEnableVertexAttribArray(1)
-        glVertexAttribPointer(
-            1,            # Attribute number
-            3,            # Size (Number of components)
-            GL_FLOAT,     # Type
-            GL_TRUE,      # Normalized?
-            0,            # Stride (Byte offset)
-            None          # Offset
-        )
+        set_vertex_attributes(vertex_VBO, vertex_dtype, [(0, "position", GL_FALSE)])
 
 
         # Create and bind EBO for face indices
-        face_EBO = glGenBuffers(1)
+        face_EBO = create_buffer(indices)
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, face_EBO)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, np.dtype(np.uint32).itemsize*self.num_indices, indices, GL_STATIC_DRAW)
 
         glBindVertexArray(0)  # Unbind VAO
 
 
+        # Wait for shader program to finish building
+        finish_program(self.program_ID, "water", shaders)
+
+        # Use shared model view projection matrix and time elapsed
+        bind_uniform_block(self.program_ID, "Frame", FRAME_BINDING)
+        bind_uniform_block(self.program_ID, "Waves", WAVES_BINDING)
 
-    def draw(self, MVP, V, M, time, light_direction):
+        # Get handle for each uniform variable
+        self.V_uniform = glGetUniformLocation(self.program_ID, "V")
+        self.M_uniform = glGetUniformLocation(self.program_ID, "M")
+        self.light_direction_uniform = glGetUniformLocation(self.program_ID, "light_direction")
+        self.outer_tess_uniform = glGetUniformLocation(self.program_ID, "outerTess")
+        self.inner_tess_uniform = glGetUniformLocation(self.program_ID, "innerTess")
+        self.displacement_map_uniform = glGetUniformLocation(self.program_ID, "displacementTexture")
+        self.water_texture_uniform = glGetUniformLocation(self.program_ID, "waterTexture")
+        num_tiles_uniform = glGetUniformLocation(self.program_ID, "numTiles")
+        tile_size_uniform = glGetUniformLocation(self.program_ID, "tileSize")
+
+        # Set uniforms that do not change between frames
+        glUseProgram(self.program_ID)
+
+        glUniform1f(self.inner_tess_uniform, 16)  # Tessellation levels
+        glUniform1f(self.outer_tess_uniform, 16)
+
+        glUniform1i(self.water_texture_uniform, 0)     # Water texture, GL_TEXTURE0
+        glUniform1i(self.displacement_map_uniform, 1)  # Displacement map, GL_TEXTURE1
+
+        glUniform1i(num_tiles_uniform, self.num_tiles)         # Tiles
+        glUniform1f(tile_size_uniform, tile_size)
+
+        glUseProgram(0)
+
+        # Specify patch size. Only the water is drawn as patches, so this is set once
+        glPatchParameteri(GL_PATCH_VERTICES, 4)
+
+
+
+    def draw(self, V, M, light_direction):
         """ Renders the patch of water at a given moment in time.
 
+        The model view projection matrix and time elapsed are read from the
+        Frame uniform block, which must be updated before drawing.
+
         Parameters
         ----------
-		MVP : glm.mat4
-			Model view projection matrix.
         V : glm.mat4
             View matrix.
         M : glm.mat4
             Model matrix.
-        time : float
-            Time elapsed.
         light_direction : glm.vec3
             Light direction.
         
         """
 
-        # Enable blending
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-
-        # Specify patch size
-        glPatchParameteri(GL_PATCH_VERTICES, 4)
-
         # Bind water texture
         glActiveTexture(GL_TEXTURE0)
         glBindTexture(GL_TEXTURE_2D, self.texture_ID[0])
@@ -349,28 +287,14 @@ class Water():
 
 
         # Set uniforms
-        glUniformMatrix4fv(self.MVP_uniform, 1, GL_FALSE, matrix_to_array(MVP, 4))  # Matrices
-        glUniformMatrix4fv(self.V_uniform, 1, GL_FALSE, matrix_to_array(V, 4))
-        glUniformMatrix4fv(self.M_uniform, 1, GL_FALSE, matrix_to_array(M, 4))
+        glUniformMatrix4fv(self.V_uniform, 1, GL_FALSE, glm.value_ptr(V))  # Matrices, passed directly without copying
+        glUniformMatrix4fv(self.M_uniform, 1, GL_FALSE, glm.value_ptr(M))
 
         glUniform3f(self.light_direction_uniform, light_direction.x, light_direction.y, light_direction.z)
-        
-        glUniform1f(self.inner_tess_uniform, 16)  # Tessellation levels
-        glUniform1f(self.outer_tess_uniform, 16)
-
-        glUniform1f(self.time_uniform, time)  # Time elapsed
-
-        glUniform1i(self.water_texture_uniform, 0)     # Water texture, GL_TEXTURE0
-        glUniform1i(self.displacement_map_uniform, 1)  # Displacement map, GL_TEXTURE1
 
 
         # Bind VAO to restore captured state
         glBindVertexArray(self.VAO)
 
-        # Draw the mesh
-        glDrawElements(GL_PATCHES, self.num_indices, GL_UNSIGNED_INT, None)
-
-        # Unbind VAO and textures, clean up shader program
-        glBindVertexArray(0)
-        glUseProgram(0)
-        glDisable(GL_BLEND)
\ No newline at end of file
+        # Draw an instance of the mesh for each tile
+        glDrawElementsInstanced(GL_PATCHES, self.num_indices, self.index_type, None, self.num_tiles**2)
\ No newline at end of file